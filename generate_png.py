@@ -3,11 +3,15 @@ import customtkinter as ctk
 from tkinter import colorchooser
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageTk, ImageFont
-import subprocess
 import sys
-from apiinference import generate_ui_code
+from collections import OrderedDict
+from llm_client import LLMError, close_client, get_client
 import json
 from layout_flow import build_layout
+from scaffold import fresh_project
+from publish import get_uploader, publish_site
+from memory_stats import AllocationTracker, MemoryBudget, format_bytes, memory_report
+from replay import InputRecorder
 import re
 # Higher default scaling so the UI is crisp/readable on high-DPI displays.
 UI_SCALE = float(os.environ.get("MINIPAINT_UI_SCALE", 1.3))
@@ -72,10 +76,25 @@ class MiniPaint(ctk.CTk):
         self.file_images = {self.current_file: self._new_blank_image()}
         self.file_history = {self.current_file: []}
         self.history_limit = 10
+        # Pages drawn on since their last history snapshot
+        self.dirty_files = set()
+        # Ready-to-display PhotoImages per page, most recently shown last
+        self.photo_cache = OrderedDict()
+        self.photo_cache_size = max(1, int(os.environ.get("MINIPAINT_PHOTO_CACHE", 4)))
+
+        # Memory accounting
+        self.memory_budget = MemoryBudget.from_env()
+        self.alloc_tracker = AllocationTracker(enabled=os.environ.get("MINIPAINT_TRACE_ALLOC") == "1")
 
         # counter for PNG generation
         self.save_counter = 1
 
+        # Input recording for replay benchmarks (see replay.py); must wrap handlers before widgets bind them.
+        self.recorder = InputRecorder.from_env()
+        if self.recorder:
+            self.recorder.attach(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # UI
         self.create_toolbar()
         self.create_canvas()
@@ -223,7 +242,7 @@ class MiniPaint(ctk.CTk):
         self.draw = ImageDraw.Draw(self.img)
 
         # Show on canvas
-        self.tk_img = ImageTk.PhotoImage(self.img)
+        self.tk_img = self._make_photo(self.img)
         self.canvas = ctk.CTkCanvas(
             self.canvas_frame,
             width=self.canvas_width,
@@ -234,6 +253,7 @@ class MiniPaint(ctk.CTk):
         self.canvas.pack(padx=6, pady=6)
 
         self.canvas_img_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_img)
+        self.photo_cache[self.current_file] = self.tk_img
 
         # Mouse events
         self.canvas.bind("<Button-1>", self.start_draw)
@@ -254,6 +274,14 @@ class MiniPaint(ctk.CTk):
                                          anchor="w", font=self.font_status)
         self.status_label.pack(side="left", padx=10, pady=6)
 
+        ctk.CTkButton(status_bar, text="🧠 Memory", width=100,
+                      command=self.show_memory_panel,
+                      font=self.font_status).pack(side="right", padx=(4, 10), pady=4)
+
+        self.memory_label = ctk.CTkLabel(status_bar, text=self.memory_text(), anchor="e",
+                                         text_color="#555", font=self.font_status)
+        self.memory_label.pack(side="right", padx=10, pady=6)
+
         self.message_label = ctk.CTkLabel(status_bar, text="", anchor="e",
                                           text_color="#555", font=self.font_status)
         self.message_label.pack(side="right", padx=10, pady=6)
@@ -263,8 +291,14 @@ class MiniPaint(ctk.CTk):
         return (f"File: {self.current_file} • Tool: {self.mode_labels[self.mode]} • Stroke: {self.brush_size}px • "
                 f"Text: {self.text_size}px • Color: {self.current_color} • Fill: {fill_state}")
 
+    def memory_text(self):
+        report = memory_report(self)
+        return f"Mem: {format_bytes(report['total'])} • RSS: {format_bytes(report['rss'])}"
+
     def refresh_status(self, message=None):
         self.status_label.configure(text=self.status_text())
+        if hasattr(self, "memory_label"):
+            self.memory_label.configure(text=self.memory_text())
         if message is not None:
             self.message_label.configure(text=message)
 
@@ -384,6 +418,8 @@ class MiniPaint(ctk.CTk):
         self.files = [f for f in self.files if f != to_remove]
         self.file_images.pop(to_remove, None)
         self.file_history.pop(to_remove, None)
+        self.photo_cache.pop(to_remove, None)
+        self.dirty_files.discard(to_remove)
 
         self.file_selector.configure(values=self.files)
         self.refresh_status(f"Removed {to_remove}")
@@ -407,7 +443,9 @@ class MiniPaint(ctk.CTk):
         if hasattr(self, "file_selector") and self.file_selector.get() != filename:
             self.file_selector.set(filename)
 
-        self.update_canvas_image()
+        # Every edit refreshes the page's cached photo, so a cached one is always current.
+        photo = self.photo_cache.get(filename)
+        self._display_photo(photo if photo is not None else self._make_photo(self.img))
         self.refresh_status(f"Switched to {filename}")
         self.on_file_change(filename)
 
@@ -421,12 +459,29 @@ class MiniPaint(ctk.CTk):
         return Image.new("RGB", (self.canvas_width, self.canvas_height), "white")
 
     def record_file_history(self, filename):
-        if filename not in self.file_images:
+        # Only snapshot pages that changed since their last snapshot
+        if filename not in self.file_images or filename not in self.dirty_files:
             return
+        self.dirty_files.discard(filename)
         hist = self.file_history.setdefault(filename, [])
         hist.append(self.file_images[filename].copy())
         if len(hist) > self.history_limit:
             hist.pop(0)
+        self.enforce_memory_budget()
+
+    def enforce_memory_budget(self):
+        problems, evicted = self.memory_budget.enforce(self)
+        if evicted:
+            print(f"[!] Memory budget: evicted {evicted} history snapshot(s)")
+        if problems:
+            print(f"[!] Memory budget exceeded: {'; '.join(problems)}")
+            self.refresh_status(f"Memory over budget: {problems[0]}")
+
+    def on_close(self):
+        if self.recorder:
+            self.recorder.close()
+        close_client()
+        self.destroy()
 
     def on_file_change(self, filename):
         """Hook that fires when the active file changes."""
@@ -518,16 +573,18 @@ class MiniPaint(ctk.CTk):
             return
 
         fill = self.current_color if (self.fill_shapes and self.mode != "line") else None
+        # Pillow requires x0 <= x1 and y0 <= y1 for boxes; drags can go in any direction.
+        box = [min(x0, x), min(y0, y), max(x0, x), max(y0, y)]
 
         if self.mode == "line":
             self.draw.line((x0, y0, x, y), fill=self.current_color, width=self.brush_size)
         elif self.mode == "rectangle":
-            self.draw.rectangle([x0, y0, x, y],
+            self.draw.rectangle(box,
                                 outline=self.current_color,
                                 fill=fill,
                                 width=self.brush_size)
         elif self.mode == "ellipse":
-            self.draw.ellipse([x0, y0, x, y],
+            self.draw.ellipse(box,
                               outline=self.current_color,
                               fill=fill,
                               width=self.brush_size)
@@ -557,9 +614,21 @@ class MiniPaint(ctk.CTk):
     # ----------------------
     # UPDATE CANVAS
     # ----------------------
+    def _make_photo(self, img):
+        return ImageTk.PhotoImage(img)
+
+    def _display_photo(self, photo):
+        self.tk_img = photo
+        self.canvas.itemconfig(self.canvas_img_id, image=photo)
+        self.photo_cache[self.current_file] = photo
+        self.photo_cache.move_to_end(self.current_file)
+        while len(self.photo_cache) > self.photo_cache_size:
+            self.photo_cache.popitem(last=False)
+
     def update_canvas_image(self):
-        self.tk_img = ImageTk.PhotoImage(self.img)
-        self.canvas.itemconfig(self.canvas_img_id, image=self.tk_img)
+        """Redisplay the current page after it was drawn on."""
+        self.dirty_files.add(self.current_file)
+        self._display_photo(self._make_photo(self.img))
 
     # ----------------------
     # CLEAR CANVAS
@@ -572,10 +641,60 @@ class MiniPaint(ctk.CTk):
         self.update_canvas_image()
         self.refresh_status("Canvas cleared")
 
+    # ----------------------
+    # MEMORY PANEL
+    # ----------------------
+    def show_memory_panel(self):
+        report = memory_report(self)
+        lines = [
+            f"Total held: {format_bytes(report['total'])}",
+            f"RSS: {format_bytes(report['rss'])}   Peak RSS: {format_bytes(report['peak_rss'])}",
+            "",
+            "By structure:",
+        ]
+        for key, size in report["structures"].items():
+            lines.append(f"  {key:<10}{format_bytes(size):>12}")
+        lines += ["", "By page:"]
+        for name, page in report["pages"].items():
+            lines.append(
+                f"  {name}: {format_bytes(page['total'])} (image {format_bytes(page['image'])}, "
+                f"history {format_bytes(page['history'])} x{page['history_count']}, "
+                f"code {format_bytes(page['code'])}, display {format_bytes(page['display'])})"
+            )
+        lines += ["", "Memory retained per save (net new blocks / bytes, peak):"]
+        if not self.alloc_tracker.enabled:
+            lines.append("  disabled (set MINIPAINT_TRACE_ALLOC=1)")
+        for record in self.alloc_tracker.records:
+            lines.append(
+                f"  {record['label']}: {record['blocks']} net new blocks, {format_bytes(record['bytes'])} "
+                f"net new bytes, peak {format_bytes(record['peak_bytes'])}"
+            )
+        problems = self.memory_budget.violations(report)
+        lines += ["", "Budget: " + ("; ".join(problems) if problems else "OK")]
+
+        panel = ctk.CTkToplevel(self)
+        panel.title("Memory")
+        panel.geometry("760x480")
+        box = ctk.CTkTextbox(panel, font=self.font_status)
+        box.pack(fill="both", expand=True, padx=10, pady=10)
+        box.insert("1.0", "\n".join(lines))
+        box.configure(state="disabled")
+
     # ----------------------
     # GENERATE PNG
     # ----------------------
     def generate_png(self):
+        with self.alloc_tracker.track(f"save {self.current_file}"):
+            self._generate_png()
+        if self.alloc_tracker.enabled and self.alloc_tracker.last:
+            last = self.alloc_tracker.last
+            print(
+                f"[*] {last['label']}: {last['blocks']} net new blocks, {format_bytes(last['bytes'])} "
+                f"net new bytes, peak {format_bytes(last['peak_bytes'])}"
+            )
+        self.refresh_status()
+
+    def _generate_png(self):
         filename = self.current_file
         self.record_file_history(self.current_file)
         file_path = self.images_dir / filename
@@ -613,155 +732,63 @@ class MiniPaint(ctk.CTk):
         print(f"Layout JSON written to {layout_path}")
 
         try:
-            code, context = generate_ui_code(
+            code, context = get_client().generate_ui_code(
                 full_layout_json,
                 filename=filename,
                 components=self.generated_code,
                 palette=self.palettes.get(self.current_palette_name)
             )
-            layout["page_context"] = context
-            history[filename] = layout
-            layout_path.write_text(json.dumps(history, indent=2))
-            self.generated_code[filename] = code
-
-            path = "./websiteTemp/app"
+        except LLMError as exc:
+            print(f"Model invocation failed: {exc}")
+            self.refresh_status(f"Generation failed for {filename}: {exc}")
+            return
 
-            # extract only filename without extension
-            folder = image_name.rsplit(".",1)[0]
-            output_dir = f"{path}/{folder}"
+        layout["page_context"] = context
+        history[filename] = layout
+        layout_path.write_text(json.dumps(history, indent=2))
+        self.generated_code[filename] = code
 
-            print(1)
+        path = "./websiteTemp/app"
 
-            # Create directory if not present (no crash)
-            os.makedirs(output_dir, exist_ok=True)
+        # extract only filename without extension
+        folder = image_name.rsplit(".",1)[0]
+        output_dir = f"{path}/{folder}"
 
-            # Always rewrite safely
-            Path(f"{output_dir}/page.tsx").write_text(code)
+        # Create directory if not present (no crash)
+        os.makedirs(output_dir, exist_ok=True)
 
-            print("Generated UI written successfully.")
+        # Always rewrite safely
+        Path(f"{output_dir}/page.tsx").write_text(code)
 
-        except Exception as exc:
-            print(f"Model invocation failed: {exc}")
+        print("Generated UI written successfully.")
 
     # ----------------------
-    # DEPLOY PLACEHOLDER
+    # DEPLOY
     # ----------------------
     def deploy_site(self):
-        # Placeholder: hook up actual deploy logic (e.g., Vercel CLI) here.
-        self.refresh_status("Deploy triggered (not implemented yet)")
-
-def ensure_package_manager_is_npm(project_root: Path):
-    """Force packageManager to npm so shadcn uses npm instead of bun."""
-    pkg_path = project_root / "package.json"
-    if not pkg_path.exists():
-        print(f"[!] package.json not found under {project_root}. Skipping shadcn setup.")
-        return
-    try:
-        data = json.loads(pkg_path.read_text())
-    except Exception as exc:
-        print(f"[!] Could not read package.json: {exc}")
-        return
-    if "packageManager" not in data:
-        npm_version = subprocess.run(["npm", "-v"], capture_output=True, text=True)
-        version_str = (npm_version.stdout or "").strip() or "latest"
-        data["packageManager"] = f"npm@{version_str}"
-        pkg_path.write_text(json.dumps(data, indent=2))
-        print(f"[✔] Set packageManager to npm@{version_str}")
-
-
-def ensure_shadcn_setup(project_root: Path):
-    """Initialize shadcn/ui once using npm (creates components.json)."""
-    components_config = project_root / "components.json"
-    ensure_package_manager_is_npm(project_root)
-    if not components_config.exists():
-        print("[*] Initializing shadcn/ui with npm...")
+        project_root = Path("./websiteTemp")
+        if not project_root.is_dir():
+            self.refresh_status("Nothing to deploy yet (websiteTemp missing)")
+            return
+        output_dir = Path(os.environ.get("MINIPAINT_PUBLISH_DIR", "./publish"))
+        upload_dir = Path(os.environ.get("MINIPAINT_UPLOAD_DIR", "./deployed"))
         try:
-            subprocess.run(
-                # Some shadcn versions reject --package-manager; rely on packageManager in package.json instead.
-                ["npx", "--yes", "shadcn@latest", "init"],
-                cwd=project_root,
-                check=False,
-            )
-        except FileNotFoundError:
-            print("[!] npm or npx not found; cannot initialize shadcn/ui.")
+            result = publish_site(project_root, output_dir, get_uploader(dest=upload_dir))
+        except Exception as exc:
+            print(f"[!] Deploy failed: {exc}")
+            self.refresh_status(f"Deploy failed: {exc}")
             return
-    # Add a few core components up front to avoid repeated prompts.
-    basic_components = [
-        "button",
-        "input",
-        "card",
-        "textarea",
-        "dialog",
-        "dropdown-menu",
-        "navigation-menu",
-        "separator",
-        "label",
-        "checkbox",
-        "sheet",
-        "avatar"
-    ]
-    try:
-        subprocess.run(
-            ["npx", "--yes", "shadcn@latest", "add", *basic_components],
-            cwd=project_root,
-            check=False,
-        )
-    except FileNotFoundError:
-        print("[!] npm or npx not found; cannot add shadcn/ui components.")
-
+        changed, removed = len(result["changed"]), len(result["removed"])
+        print(f"[✔] Published {changed} changed, {removed} removed, {result['unchanged']} unchanged")
+        self.refresh_status(f"Deployed: {changed} changed, {removed} removed, {result['unchanged']} unchanged")
 
-def ensure_tsconfig_aliases(project_root: Path):
-    """Make sure tsconfig.json has @/* and ~/* pointing to project root."""
-    ts_path = project_root / "websiteTemp/tsconfig.json"
-    if not ts_path.exists():
-        print(f"[!] tsconfig.json not found under {project_root}, skipping alias setup.")
-        return
-    raw = ts_path.read_text()
-    # Strip /* ... */ and // ... comments to parse as JSON
-    data = raw.replace('"~/*": ["./*"]','"~/*": ["./*"],"@/*": ["./*"]')
-    ts_path.write_text(data)
-    # compiler = data.setdefault("compilerOptions", {})
-    # paths = compiler.setdefault("paths", {})
-    # desired = {"@/*": ["./*"], "~/*": ["./*"]}
-
-    # changed = False
-    # for alias, target in desired.items():
-    #     if paths.get(alias) != target:
-    #         paths[alias] = target
-    #         changed = True
-    print("replaced")
-    # if changed:
-    #     ts_path.write_text(json.dumps(data, indent=2))
-    #     print("[✔] Ensured tsconfig path aliases for @/* and ~/*")
-
-import shutil
 if __name__ == "__main__":
 
     if(len(sys.argv) > 1) and sys.argv[1] == '--fresh':
-        # Create / reset project
-        if not os.path.isdir("./websiteTemp"):
-            os.mkdir("./websiteTemp")
-        folder = './websiteTemp'
-        for filename in os.listdir(folder):
-            file_path = os.path.join(folder, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                print('Failed to delete %s. Reason: %s' % (file_path, e))
-
-        path = "./websiteTemp"
-        os.chdir(path)
-
-        subprocess.run(["npx", '-y', "degit", "rajput-hemant/nextjs-template"])
-        subprocess.run(["npm", "i"])
-        subprocess.run(['npm', 'install', '@mantine/core', '@mantine/hooks', '@nextui-org/react', 'flowbite-react', 'daisyui', '@headlessui/react'])
-        subprocess.run(['npm', 'install', 'tw-animate-css'])
-        project_root = Path.cwd()
-        ensure_tsconfig_aliases(project_root)
-        ensure_shadcn_setup(project_root)
+        # Create / reset project from the cached template snapshot. This no longer chdirs into
+        # websiteTemp: the editor keeps the launch directory, so ./websiteTemp/app and
+        # layout_output.json resolve from there with or without --fresh.
+        fresh_project(Path("./websiteTemp").resolve(), rebuild="--rebuild-template" in sys.argv)
 
 
     app = MiniPaint()
@@ -2,31 +2,218 @@ import json
 import sys
 from pathlib import Path
 
-from apiinference import generate_ui_code
-from inference import run_detection
-from tesseract_infer import run_ocr
+import numpy as np
+
+
+def _element_class(element):
+    return element.get("label", element.get("class"))
+
+
+def _element_score(element):
+    return float(element.get("confidence", element.get("score", 0.0)) or 0.0)
+
+
+def suppress_duplicate_boxes(
+    elements,
+    iou_threshold: float = 0.6,
+    containment_threshold: float = 0.9,
+    min_area_ratio: float = 0.5,
+    class_aware: bool = True,
+    merge: bool = True,
+):
+    """Drop near-duplicate detections before text assignment.
+
+    A lower-scoring box is removed when its IoU with a kept box reaches iou_threshold, or
+    when it lies mostly inside (containment_threshold) a kept box of similar size
+    (min_area_ratio), so genuinely nested elements like a button inside a card survive.
+    With merge=True the kept box grows to the union of the boxes it absorbed.
+    Returns (kept_elements, removed_count).
+    """
+    if len(elements) < 2:
+        return list(elements), 0
+
+    boxes = np.asarray([el["bbox"] for el in elements], dtype=float)
+    scores = np.asarray([_element_score(el) for el in elements])
+    classes = [_element_class(el) for el in elements]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    iw = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    ih = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    inter = iw * ih
+    union = areas[:, None] + areas[None, :] - inter
+    iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    smaller = np.minimum(areas[:, None], areas[None, :])
+    larger = np.maximum(areas[:, None], areas[None, :])
+    containment = np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0)
+    area_ratio = np.divide(smaller, larger, out=np.zeros_like(inter), where=larger > 0)
+
+    duplicate = (iou >= iou_threshold) | ((containment >= containment_threshold) & (area_ratio >= min_area_ratio))
+    if class_aware:
+        _, class_ids = np.unique(np.asarray([str(c) for c in classes]), return_inverse=True)
+        duplicate &= class_ids[:, None] == class_ids[None, :]
+    np.fill_diagonal(duplicate, False)
+
+    # Greedy pass in descending score; each kept box absorbs its remaining duplicates.
+    order = np.argsort(-scores, kind="stable")
+    alive = np.ones(len(elements), dtype=bool)
+    kept = {}
+    for idx in order:
+        if not alive[idx]:
+            continue
+        absorbed = duplicate[idx] & alive
+        alive[absorbed] = False
+        alive[idx] = False
+        element = dict(elements[idx])
+        if merge and absorbed.any():
+            group = boxes[absorbed | (np.arange(len(elements)) == idx)]
+            element["bbox"] = [
+                float(group[:, 0].min()),
+                float(group[:, 1].min()),
+                float(group[:, 2].max()),
+                float(group[:, 3].max()),
+            ]
+        kept[idx] = element
+
+    # Hand survivors back in detection order: text attachment gives each word to the
+    # first element that contains it, so score order would change who owns the text.
+    return [kept[idx] for idx in sorted(kept)], len(elements) - len(kept)
+
+
+def _entry_extent(entry):
+    xs = [p[0] for p in entry["bbox"]]
+    ys = [p[1] for p in entry["bbox"]]
+    if not xs:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _entry_center(entry):
+    xs = [p[0] for p in entry["bbox"]]
+    ys = [p[1] for p in entry["bbox"]]
+    cx = sum(xs) / len(xs) if xs else 0.0
+    cy = sum(ys) / len(ys) if ys else 0.0
+    return cx, cy
+
+
+def _merge_group(group):
+    x1 = min(e[0] for e, _ in group)
+    y1 = min(e[1] for e, _ in group)
+    x2 = max(e[2] for e, _ in group)
+    y2 = max(e[3] for e, _ in group)
+    entries = [entry for _, entry in group]
+    merged = {
+        "text": " ".join(str(entry.get("text", "")).strip() for entry in entries).strip(),
+        "bbox": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+        "word_count": sum(entry.get("word_count", 1) for entry in entries),
+    }
+    confidences = [entry["confidence"] for entry in entries if entry.get("confidence") is not None]
+    if confidences:
+        merged["confidence"] = sum(confidences) / len(confidences)
+    return merged
+
+
+def _owner_indices(entries, element_boxes):
+    """Index of the first element box containing each entry's center, or -1."""
+    if not entries:
+        return np.zeros(0, dtype=int)
+    centers = np.asarray([_entry_center(entry) for entry in entries], dtype=float)
+    boxes = np.asarray(element_boxes, dtype=float).reshape(len(element_boxes), 4)
+    cx, cy = centers[:, :1], centers[:, 1:]
+    inside = (boxes[:, 0] <= cx) & (cx <= boxes[:, 2]) & (boxes[:, 1] <= cy) & (cy <= boxes[:, 3])
+    # First containing element wins, matching detection order.
+    owner = inside.argmax(axis=1) if len(element_boxes) else np.zeros(len(entries), dtype=int)
+    return np.where(inside.any(axis=1), owner, -1)
+
+
+def merge_ocr_entries(entries, level: str = "line", line_tol: float = 0.5, word_gap: float = 1.5,
+                      para_gap: float = 0.8, element_boxes=None):
+    """Group OCR word entries into lines (or paragraphs) with a sort-and-sweep pass.
+
+    Words join a line when their vertical centers are within line_tol * word height and the
+    horizontal gap to the previous word is at most word_gap * height. With level="paragraph",
+    consecutive lines that overlap horizontally and sit within para_gap * line height are joined too.
+    When element_boxes are given, words or lines whose centers fall in different elements are
+    never merged, so adjacent elements keep their own text.
+    Each merged entry keeps the polygon bbox format with a single enclosing box.
+    """
+    entries = [entry for entry in entries if entry.get("bbox")]
+    if not entries:
+        return []
+    items = [(_entry_extent(entry), entry) for entry in entries]
+    owners = {}
+    if element_boxes is not None:
+        owners = {id(entry): int(idx) for entry, idx in zip(entries, _owner_indices(entries, element_boxes))}
+
+    # Sweep top-to-bottom into rows of words sharing a baseline band.
+    items.sort(key=lambda it: ((it[0][1] + it[0][3]) / 2.0, it[0][0]))
+    rows = []
+    for extent, entry in items:
+        cy = (extent[1] + extent[3]) / 2.0
+        height = max(extent[3] - extent[1], 1e-9)
+        if rows and abs(cy - rows[-1]["cy"]) <= line_tol * max(height, rows[-1]["height"]):
+            row = rows[-1]
+            row["items"].append((extent, entry))
+            row["cy"] += (cy - row["cy"]) / len(row["items"])
+            row["height"] = max(row["height"], height)
+        else:
+            rows.append({"cy": cy, "height": height, "items": [(extent, entry)]})
+
+    # Split each row left-to-right wherever the horizontal gap is too wide.
+    lines = []
+    for row in rows:
+        row["items"].sort(key=lambda it: it[0][0])
+        current = [row["items"][0]]
+        for extent, entry in row["items"][1:]:
+            prev_extent, prev_entry = current[-1]
+            same_owner = owners.get(id(entry)) == owners.get(id(prev_entry))
+            if same_owner and extent[0] - prev_extent[2] <= word_gap * row["height"]:
+                current.append((extent, entry))
+            else:
+                lines.append(_merge_group(current))
+                owners[id(lines[-1])] = owners.get(id(current[0][1]))
+                current = [(extent, entry)]
+        lines.append(_merge_group(current))
+        owners[id(lines[-1])] = owners.get(id(current[0][1]))
+
+    if level != "paragraph":
+        return lines
+
+    lines.sort(key=lambda line: (line["bbox"][0][1], line["bbox"][0][0]))
+    paragraphs = []
+    open_groups = []
+    for line in lines:
+        extent = _entry_extent(line)
+        height = extent[3] - extent[1]
+        target = None
+        for group in open_groups:
+            last, last_line = group[-1]
+            if owners.get(id(line)) != owners.get(id(last_line)):
+                continue
+            overlaps = extent[0] <= last[2] and last[0] <= extent[2]
+            if overlaps and 0 <= extent[1] - last[3] <= para_gap * max(height, last[3] - last[1]):
+                target = group
+                break
+        if target is None:
+            open_groups.append([(extent, line)])
+        else:
+            target.append((extent, line))
+    for group in open_groups:
+        paragraphs.append(_merge_group(group))
+    return paragraphs
 
 
 def attach_text_to_elements(det_data, ocr_data):
     """Attach OCR text to the detected element whose box contains the text center."""
     elements = [dict(el, texts=[]) for el in det_data.get("elements", [])]
+    entries = ocr_data.get("entries", [])
     unassigned = []
 
-    for entry in ocr_data.get("entries", []):
-        xs = [p[0] for p in entry["bbox"]]
-        ys = [p[1] for p in entry["bbox"]]
-        cx = sum(xs) / len(xs) if xs else 0.0
-        cy = sum(ys) / len(ys) if ys else 0.0
-
-        placed = False
-        for element in elements:
-            x1, y1, x2, y2 = element["bbox"]
-            if x1 <= cx <= x2 and y1 <= cy <= y2:
-                element["texts"].append(entry)
-                placed = True
-                break
-
-        if not placed:
+    owners = _owner_indices(entries, [el["bbox"] for el in elements])
+    for entry, idx in zip(entries, owners):
+        if idx >= 0:
+            elements[idx]["texts"].append(entry)
+        else:
             unassigned.append(entry)
 
     layout = {
@@ -73,17 +260,47 @@ def add_section_ordering(elements, gap: float = 0.08):
     return sorted_elements
 
 
-def build_layout(image_path: str, annotated_path: str = "frontend_detected.png"):
-    det_data = run_detection(image_path=image_path, save_annotated_path=annotated_path)
-    ocr_data = run_ocr(image_path=image_path)
+def build_layout(
+    image_path: str,
+    annotated_path: str = "frontend_detected.png",
+    nms: dict = None,
+    text_level: str = "line",
+    detect=None,
+    ocr=None,
+):
+    """Run detection + OCR and assemble the layout.
+
+    nms is passed to suppress_duplicate_boxes (False disables it). text_level is "line" or
+    "paragraph" to merge OCR words before assignment, or None to keep raw word entries.
+    detect/ocr default to the real models, which are only imported when needed.
+    """
+    if detect is None:
+        from inference import run_detection as detect
+    if ocr is None:
+        from tesseract_infer import run_ocr as ocr
+    det_data = detect(image_path=image_path, save_annotated_path=annotated_path)
+    ocr_data = ocr(image_path=image_path)
+    if nms is not False:
+        elements, removed = suppress_duplicate_boxes(det_data.get("elements", []), **(nms or {}))
+        det_data = dict(det_data, elements=elements)
+        print(f"[✔] Suppressed {removed} duplicate element(s)")
+    if text_level:
+        raw_entries = ocr_data.get("entries", [])
+        merged = merge_ocr_entries(
+            raw_entries,
+            level=text_level,
+            element_boxes=[el["bbox"] for el in det_data.get("elements", [])],
+        )
+        ocr_data = dict(ocr_data, entries=merged)
+        print(f"[✔] Merged {len(raw_entries)} OCR entries into {len(merged)} {text_level}s")
     layout = attach_text_to_elements(det_data, ocr_data)
     layout["elements"] = add_section_ordering(layout.get("elements", []))
     return layout
 
 
 def main():
+    from apiinference import generate_ui_code
 
-    
     image_path = sys.argv[1] if len(sys.argv) > 1 else "frontend.png"
     layout = build_layout(image_path)
 
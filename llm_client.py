@@ -0,0 +1,295 @@
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from urllib.parse import urlsplit
+
+
+class LLMError(Exception):
+    """Raised when page generation fails after all retries."""
+
+
+class LLMTimeout(LLMError):
+    """Raised when a generation call misses its deadline."""
+
+
+class LLMBusy(LLMError):
+    """Raised when every model request slot is taken; not retried and not a model timeout."""
+
+
+class TransientLLMError(LLMError):
+    """A failure worth retrying, e.g. rate limiting or a 5xx from the model endpoint."""
+
+
+# HTTP statuses that indicate the request may succeed if repeated.
+TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_transient(exc) -> bool:
+    """Whether a backend failure should be retried; bad requests and programming errors are not."""
+    if isinstance(exc, (TransientLLMError, LLMTimeout, ConnectionError, TimeoutError, http.client.HTTPException)):
+        return True
+    # Model SDKs expose the HTTP status of API errors under one of these names.
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    return status in TRANSIENT_STATUSES
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to a single host, reused across calls and threads."""
+
+    def __init__(self, url: str, size: int = 8, timeout: float = 60.0):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _new_connection(self, timeout):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+    def request(self, method: str, body: bytes, headers: dict, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            conn = self._idle.get_nowait()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        except queue.Empty:
+            conn = self._new_connection(timeout)
+        try:
+            conn.request(method, self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, payload
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HttpBackend:
+    """POSTs the generate_ui_code arguments as JSON and expects {"code": ..., "context": ...} back."""
+
+    accepts_timeout = True
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 60.0):
+        self.pool = ConnectionPool(url, size=pool_size, timeout=timeout)
+
+    def __call__(self, layout_json, filename=None, components=None, palette=None, timeout=None):
+        body = json.dumps({
+            "layout": layout_json,
+            "filename": filename,
+            "components": components or {},
+            "palette": palette,
+        }).encode("utf-8")
+        status, payload = self.pool.request(
+            "POST", body, {"Content-Type": "application/json"}, timeout=timeout
+        )
+        if status != 200:
+            error = TransientLLMError if status in TRANSIENT_STATUSES else LLMError
+            raise error(f"Model endpoint returned HTTP {status}: {payload[:200]!r}")
+        data = json.loads(payload)
+        return data["code"], data.get("context")
+
+
+class LLMClient:
+    """Deadline, retry, hedging and concurrency control around a generate_ui_code-style backend.
+
+    backend(layout_json, filename=, components=, palette=) must return (code, context).
+    timeout bounds each attempt and max_retries adds attempts with exponential backoff for
+    transient failures. All calls made through one client share max_concurrency requests in
+    flight; a request that missed its deadline keeps its slot until it really returns. A call
+    waits up to queue_timeout for a free slot (0 fails at once) and then raises LLMBusy.
+
+    A backend can only be abandoned safely if it stops at the deadline itself (it sets
+    accepts_timeout and takes a timeout= keyword, like HttpBackend). For other backends a
+    timed-out request may still be running, so the call fails instead of retrying on top of
+    it, and hedge_after (one duplicate request once the first has been pending that long)
+    is ignored. Requests run on daemon threads so an abandoned one never blocks interpreter exit.
+    """
+
+    def __init__(self, backend, timeout: float = 120.0, max_retries: int = 2, backoff: float = 1.0,
+                 hedge_after: float = None, max_concurrency: int = 4, queue_timeout: float = 0.0):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "timeouts": 0,
+                      "busy": 0, "failures": 0}
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _acquire_slot(self):
+        if self.queue_timeout > 0:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            self._count("busy")
+            raise LLMBusy(f"All {self.max_concurrency} model request slots are busy")
+
+    def _start(self, args, kwargs, attempt_deadline):
+        """Run one backend request on a daemon thread; the caller must already hold a slot."""
+        self._count("attempts")
+        if self.honours_deadline:
+            kwargs = dict(kwargs, timeout=max(attempt_deadline - time.monotonic(), 0.001))
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run():
+            try:
+                result, error = self.backend(*args, **kwargs), None
+            except BaseException as exc:
+                result, error = None, exc
+            # The slot is held until the request really finishes, even if we stop waiting for it.
+            self._slots.release()
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+        threading.Thread(target=run, name="llm-request", daemon=True).start()
+        return future
+
+    @property
+    def honours_deadline(self) -> bool:
+        return bool(getattr(self.backend, "accepts_timeout", False))
+
+    def _attempt(self, args, kwargs, started_futures):
+        self._acquire_slot()
+        started = time.monotonic()
+        attempt_deadline = started + self.timeout
+        pending = {self._start(args, kwargs, attempt_deadline)}
+        started_futures.extend(pending)
+        hedged = not (self.hedge_after and self.honours_deadline)
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= attempt_deadline:
+                raise LLMTimeout(f"Model call exceeded {self.timeout:.1f}s")
+            wait_for = attempt_deadline - now
+            if not hedged:
+                wait_for = min(wait_for, max(started + self.hedge_after - now, 0))
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not hedged and pending and time.monotonic() >= started + self.hedge_after:
+                hedged = True
+                # Hedge only into a spare slot; never queue behind the request being hedged.
+                if self._slots.acquire(blocking=False):
+                    hedge = self._start(args, kwargs, attempt_deadline)
+                    self._count("hedges")
+                    pending.add(hedge)
+                    started_futures.append(hedge)
+        raise error
+
+    def generate_ui_code(self, layout_json, **kwargs):
+        """Drop-in replacement for apiinference.generate_ui_code with bounded latency."""
+        self._count("calls")
+        started_futures = []
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random() / 2))
+            try:
+                return self._attempt((layout_json,), kwargs, started_futures)
+            except Exception as exc:
+                last_error = exc
+            if isinstance(last_error, LLMTimeout):
+                self._count("timeouts")
+            print(f"[!] Model attempt {attempt + 1}/{self.max_retries + 1} failed: {last_error}")
+            if not is_transient(last_error):
+                break
+            running = [f for f in started_futures if not f.done()]
+            if running and self.honours_deadline:
+                # These stop at their own deadline; give them a moment to hand their slots back.
+                wait(running, timeout=1.0)
+            if any(not f.done() for f in started_futures):
+                # An earlier request is still running and holding its slot; don't pile another on top.
+                break
+        self._count("failures")
+        if isinstance(last_error, LLMError):
+            raise last_error
+        raise LLMError(str(last_error)) from last_error
+
+    def close(self):
+        pool = getattr(self.backend, "pool", None)
+        if pool is not None:
+            pool.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _env_float(name, default=None):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def get_client() -> LLMClient:
+    """Process-wide client so every page shares one connection pool and concurrency limit.
+
+    Configured via MINIPAINT_LLM_URL (use an HTTP endpoint instead of apiinference),
+    MINIPAINT_LLM_TIMEOUT, MINIPAINT_LLM_RETRIES, MINIPAINT_LLM_HEDGE_AFTER,
+    MINIPAINT_LLM_CONCURRENCY and MINIPAINT_LLM_QUEUE_TIMEOUT.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            concurrency = int(_env_float("MINIPAINT_LLM_CONCURRENCY", 4))
+            timeout = _env_float("MINIPAINT_LLM_TIMEOUT", 120.0)
+            url = os.environ.get("MINIPAINT_LLM_URL")
+            if url:
+                backend = HttpBackend(url, pool_size=concurrency, timeout=timeout)
+            else:
+                from apiinference import generate_ui_code
+                backend = generate_ui_code
+            _client = LLMClient(
+                backend,
+                timeout=timeout,
+                max_retries=int(_env_float("MINIPAINT_LLM_RETRIES", 2)),
+                hedge_after=_env_float("MINIPAINT_LLM_HEDGE_AFTER"),
+                max_concurrency=concurrency,
+                queue_timeout=_env_float("MINIPAINT_LLM_QUEUE_TIMEOUT", 0.0),
+            )
+        return _client
+
+
+def close_client():
+    """Close the process-wide client if one was created; the next get_client() builds a new one."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
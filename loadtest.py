@@ -0,0 +1,276 @@
+"""Headless load test for the sketch -> layout -> code pipeline.
+
+Runs the same stages generate_png does (detection, OCR, layout assembly, model call,
+page write) without Tk. Detection and OCR are replaced by stubs with configurable
+latency and the model is a local HTTP server that streams canned TSX, so the numbers
+measure the pipeline and its concurrency settings rather than the models.
+
+    python loadtest.py --pages 50 --concurrency 1,4,8 --model-latency 0.5
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from memory_stats import percentile
+
+CANNED_TSX = """export default function Page() {
+  return (
+    <main className="flex min-h-screen flex-col items-center gap-6 p-12">
+      <h1 className="text-4xl font-bold">Generated page</h1>
+      <p className="text-muted-foreground">Canned output from the load-test stub model.</p>
+    </main>
+  );
+}
+"""
+
+STAGES = ("detect", "ocr", "layout", "generate", "write", "total")
+
+
+def _sleep(rng, mean, jitter):
+    if mean > 0:
+        time.sleep(max(0.0, rng.gauss(mean, mean * jitter)))
+
+
+class StubPipeline:
+    """Stand-ins for run_detection / run_ocr that sleep and return plausible layouts."""
+
+    def __init__(self, detect_latency=0.05, ocr_latency=0.05, jitter=0.2, elements=25, words=200, seed=0):
+        self.detect_latency = detect_latency
+        self.ocr_latency = ocr_latency
+        self.jitter = jitter
+        self.elements = elements
+        self.words = words
+        self.seed = seed
+        self._local = threading.local()
+
+    def _rng(self):
+        return self._local.rng
+
+    def _record(self, stage, seconds):
+        self._local.timings[stage] = seconds
+
+    def begin(self, index):
+        """Start page `index` on this thread; its layout depends only on seed and index."""
+        self._local.rng = random.Random(f"{self.seed}:{index}")
+        self._local.timings = {}
+        return self._local.timings
+
+    def run_detection(self, image_path, save_annotated_path=None):
+        start = time.perf_counter()
+        rng = self._rng()
+        _sleep(rng, self.detect_latency, self.jitter)
+        elements = []
+        for _ in range(self.elements):
+            x1, y1 = rng.random() * 0.8, rng.random() * 0.8
+            elements.append({
+                "label": rng.choice(["button", "card", "input", "navbar", "text"]),
+                "confidence": rng.random(),
+                "bbox": [x1, y1, x1 + 0.05 + rng.random() * 0.15, y1 + 0.03 + rng.random() * 0.1],
+            })
+        self._record("detect", time.perf_counter() - start)
+        return {"image_path": image_path, "image_size": [1920, 1080], "elements": elements}
+
+    def run_ocr(self, image_path):
+        start = time.perf_counter()
+        rng = self._rng()
+        _sleep(rng, self.ocr_latency, self.jitter)
+        entries = []
+        for i in range(self.words):
+            line, col = divmod(i, 8)
+            x, y = 0.05 + col * 0.06, 0.05 + line * 0.03
+            entries.append({
+                "text": f"word{i}",
+                "confidence": 90.0,
+                "bbox": [[x, y], [x + 0.05, y], [x + 0.05, y + 0.02], [x, y + 0.02]],
+            })
+        self._record("ocr", time.perf_counter() - start)
+        return {"image_path": image_path, "entries": entries}
+
+
+def make_stub_handler(latency=0.5, jitter=0.2, chunks=8, chunk_delay=0.01, code=CANNED_TSX):
+    rng = random.Random(1)
+    lock = threading.Lock()
+
+    class StubModelHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                delay = max(0.0, rng.gauss(latency, latency * jitter)) if latency > 0 else 0.0
+            time.sleep(delay)
+            body = json.dumps({"code": code, "context": {"filename": request.get("filename")}}).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = max(1, len(body) // chunks)
+                for i in range(0, len(body), step):
+                    piece = body[i:i + step]
+                    self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+                    self.wfile.flush()
+                    if chunk_delay:
+                        time.sleep(chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (timeout or hedge winner); that's expected under load.
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            return
+
+    return StubModelHandler
+
+
+class StubModelServer:
+    """Local fake LLM endpoint that streams a canned TSX page back as chunked JSON."""
+
+    def __init__(self, host="127.0.0.1", port=0, **handler_options):
+        self.httpd = ThreadingHTTPServer((host, port), make_stub_handler(**handler_options))
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/generate"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def run_page(index, stubs, client, out_dir):
+    import layout_flow
+
+    timings = stubs.begin(index)
+    start = time.perf_counter()
+    filename = f"page_{index}.png"
+    try:
+        layout = layout_flow.build_layout(
+            filename, annotated_path=None, detect=stubs.run_detection, ocr=stubs.run_ocr
+        )
+        timings["layout"] = time.perf_counter() - start - timings.get("detect", 0) - timings.get("ocr", 0)
+
+        t = time.perf_counter()
+        code, _context = client.generate_ui_code(json.dumps({filename: layout}), filename=filename)
+        timings["generate"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        page_dir = out_dir / f"page_{index}"
+        page_dir.mkdir(parents=True, exist_ok=True)
+        (page_dir / "page.tsx").write_text(code)
+        timings["write"] = time.perf_counter() - t
+        ok = True
+    except Exception as exc:
+        print(f"[!] page {index} failed: {exc}")
+        ok = False
+    timings["total"] = time.perf_counter() - start
+    return ok, dict(timings)
+
+
+def run_load(pages, concurrency, stubs, server_url, model_concurrency=None, timeout=30.0,
+             retries=1, hedge_after=None):
+    """Generate `pages` pages with `concurrency` page workers; returns a summary dict."""
+    from llm_client import HttpBackend, LLMClient
+
+    model_concurrency = model_concurrency or concurrency
+    client = LLMClient(
+        HttpBackend(server_url, pool_size=model_concurrency, timeout=timeout),
+        timeout=timeout, max_retries=retries, backoff=0.1,
+        hedge_after=hedge_after, max_concurrency=model_concurrency,
+        # Page workers beyond the model slot limit queue for a slot instead of failing.
+        queue_timeout=timeout,
+    )
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(run_page, i, stubs, client, Path(tmp)) for i in range(pages)]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - started
+    client.close()
+
+    summary = {
+        "concurrency": concurrency,
+        "model_concurrency": model_concurrency,
+        "pages": pages,
+        "failed": sum(1 for ok, _ in results if not ok),
+        "elapsed": elapsed,
+        "throughput": pages / elapsed if elapsed else 0.0,
+        "client": dict(client.stats),
+        "stages": {},
+    }
+    for stage in STAGES:
+        values = [t[stage] for ok, t in results if stage in t]
+        summary["stages"][stage] = {p: percentile(values, p) for p in (50, 95, 99)}
+    return summary
+
+
+def print_summary(summary):
+    print(
+        f"\nconcurrency={summary['concurrency']} model_concurrency={summary['model_concurrency']} "
+        f"pages={summary['pages']} failed={summary['failed']} "
+        f"elapsed={summary['elapsed']:.2f}s throughput={summary['throughput']:.2f} pages/s"
+    )
+    print(f"  {'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, pcts in summary["stages"].items():
+        print(f"  {stage:<10}{pcts[50] * 1000:>10.1f}{pcts[95] * 1000:>10.1f}{pcts[99] * 1000:>10.1f}")
+    print(f"  client: {summary['client']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated page worker counts to sweep")
+    parser.add_argument("--model-concurrency", type=int, default=None,
+                        help="LLM client slot limit (defaults to the page concurrency)")
+    parser.add_argument("--detect-latency", type=float, default=0.05)
+    parser.add_argument("--ocr-latency", type=float, default=0.05)
+    parser.add_argument("--model-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency stddev as a fraction of the mean")
+    parser.add_argument("--elements", type=int, default=25)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--hedge-after", type=float, default=None)
+    parser.add_argument("--model-url", default=None, help="use an existing endpoint instead of the stub server")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    stubs = StubPipeline(args.detect_latency, args.ocr_latency, args.jitter, args.elements, args.words)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    def sweep(url):
+        out = []
+        for level in levels:
+            summary = run_load(args.pages, level, stubs, url, args.model_concurrency,
+                               args.timeout, args.retries, args.hedge_after)
+            print_summary(summary)
+            out.append(summary)
+        return out
+
+    if args.model_url:
+        summaries = sweep(args.model_url)
+    else:
+        with StubModelServer(latency=args.model_latency, jitter=args.jitter) as server:
+            summaries = sweep(server.url)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(summaries, indent=2))
+        print(f"\nSummaries written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import math
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bytes per pixel Pillow keeps in memory for each mode (RGB is padded to 4 bytes).
+_MODE_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "LA": 4, "PA": 4, "RGB": 4, "RGBA": 4,
+               "RGBX": 4, "CMYK": 4, "YCbCr": 4, "LAB": 4, "HSV": 4, "I": 4, "F": 4}
+
+
+def image_nbytes(img) -> int:
+    if img is None:
+        return 0
+    width, height = img.size
+    return width * height * _MODE_BYTES.get(img.mode, len(img.getbands()))
+
+
+def photo_nbytes(photo) -> int:
+    """Tk keeps its own 32-bit copy of every PhotoImage."""
+    if photo is None:
+        return 0
+    try:
+        return photo.width() * photo.height() * 4
+    except Exception:
+        return 0
+
+
+def format_bytes(n) -> str:
+    if n is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024.0
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile: the smallest value with at least pct% of values at or below it."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _page_photo(app, name):
+    photo = getattr(app, "photo_cache", {}).get(name)
+    if photo is None and name == app.current_file:
+        photo = getattr(app, "tk_img", None)
+    return photo
+
+
+def page_memory(app) -> dict:
+    """Bytes held per page by the live image, history copies, generated code and display image."""
+    pages = {}
+    for name in app.files:
+        img = app.img if name == app.current_file else app.file_images.get(name)
+        history = app.file_history.get(name, [])
+        code = app.generated_code.get(name) or ""
+        pages[name] = {
+            "image": image_nbytes(img),
+            "history": sum(image_nbytes(h) for h in history),
+            "history_count": len(history),
+            "code": len(code.encode("utf-8")),
+            "display": photo_nbytes(_page_photo(app, name)),
+        }
+        pages[name]["total"] = sum(v for k, v in pages[name].items() if k not in ("history_count", "total"))
+    return pages
+
+
+def memory_report(app) -> dict:
+    pages = page_memory(app)
+    structures = {
+        key: sum(p[key] for p in pages.values())
+        for key in ("image", "history", "code", "display")
+    }
+    return {
+        "pages": pages,
+        "structures": structures,
+        "total": sum(structures.values()),
+        "rss": current_rss(),
+        "peak_rss": peak_rss(),
+    }
+
+
+class AllocationTracker:
+    """Measures memory retained by tracked blocks (e.g. one save) using tracemalloc.
+
+    Each record holds the net new blocks and bytes still alive when the block ends (a
+    snapshot diff, so temporaries freed inside the block don't show up) and peak_bytes,
+    the most traced memory the block held above its starting point.
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 20):
+        self.enabled = enabled
+        self.history = history
+        self.records = []
+
+    @contextmanager
+    def track(self, label: str):
+        if not self.enabled:
+            yield
+            return
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_traced, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            diff = after.compare_to(before, "filename")
+            self.records.append({
+                "label": label,
+                "blocks": sum(stat.count_diff for stat in diff if stat.count_diff > 0),
+                "bytes": sum(stat.size_diff for stat in diff if stat.size_diff > 0),
+                "peak_bytes": max(0, peak - start_traced),
+            })
+            del self.records[:-self.history]
+            if started_here:
+                tracemalloc.stop()
+
+    @property
+    def last(self):
+        return self.records[-1] if self.records else None
+
+
+class MemoryBudget:
+    """Byte budgets for the editor. action is "warn" (report only) or "evict" (drop oldest history)."""
+
+    def __init__(self, total=None, history=None, per_page=None, action="warn"):
+        self.total = total
+        self.history = history
+        self.per_page = per_page
+        self.action = action
+
+    @classmethod
+    def from_env(cls):
+        def mb(name):
+            value = os.environ.get(name)
+            return int(float(value) * 1024 * 1024) if value else None
+
+        return cls(
+            total=mb("MINIPAINT_MEM_BUDGET_MB"),
+            history=mb("MINIPAINT_HISTORY_BUDGET_MB"),
+            per_page=mb("MINIPAINT_PAGE_BUDGET_MB"),
+            action=os.environ.get("MINIPAINT_MEM_ACTION", "warn"),
+        )
+
+    def violations(self, report) -> list:
+        problems = []
+        if self.total is not None and report["total"] > self.total:
+            problems.append(f"total {format_bytes(report['total'])} > {format_bytes(self.total)}")
+        if self.history is not None and report["structures"]["history"] > self.history:
+            problems.append(f"history {format_bytes(report['structures']['history'])} > {format_bytes(self.history)}")
+        if self.per_page is not None:
+            for name, page in report["pages"].items():
+                if page["total"] > self.per_page:
+                    problems.append(f"{name} {format_bytes(page['total'])} > {format_bytes(self.per_page)}")
+        return problems
+
+    def _eviction_target(self, report):
+        """Page whose oldest snapshot should go next, or None if eviction can't help."""
+        pages = report["pages"]
+        if self.per_page is not None:
+            over = [n for n, p in pages.items() if p["total"] > self.per_page and p["history_count"]]
+            if over:
+                return max(over, key=lambda n: pages[n]["history"])
+        over_total = self.total is not None and report["total"] > self.total
+        over_history = self.history is not None and report["structures"]["history"] > self.history
+        if over_total or over_history:
+            with_history = [n for n, p in pages.items() if p["history_count"]]
+            if with_history:
+                return max(with_history, key=lambda n: pages[n]["history"])
+        return None
+
+    def enforce(self, app):
+        """Check the budgets and, in evict mode, drop oldest history snapshots until they fit.
+
+        A page over the per-page budget only loses its own history; the total and history
+        budgets evict from whichever page holds the most history. Returns (violations, evicted_count).
+        """
+        report = memory_report(app)
+        problems = self.violations(report)
+        if not problems or self.action != "evict":
+            return problems, 0
+
+        evicted = 0
+        while self.violations(report):
+            name = self._eviction_target(report)
+            if name is None:
+                break
+            app.file_history[name].pop(0)
+            evicted += 1
+            report = memory_report(app)
+        return self.violations(report), evicted
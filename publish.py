@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from scaffold import CACHE_DIR
+
+# One manifest per (project, upload destination). Kept outside the project so --fresh,
+# which wipes websiteTemp, doesn't forget what was uploaded and stop deleting removed pages.
+STATE_DIR = Path(os.environ.get("MINIPAINT_PUBLISH_STATE", CACHE_DIR / "publish"))
+# Written into the export dir to list the files this tool put there.
+EXPORT_INDEX = ".publish_export.json"
+# Directories under the Next.js project that hold generated pages and static assets.
+PUBLISH_DIRS = ("app", "public")
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_path(project_root: Path, destination: str, state_dir: Path = None) -> Path:
+    ident = f"{Path(project_root).resolve()}\n{destination}"
+    key = hashlib.sha256(ident.encode("utf-8")).hexdigest()[:16]
+    return Path(state_dir or STATE_DIR) / f"{key}.json"
+
+
+def load_manifest(project_root: Path, destination: str, state_dir: Path = None) -> dict:
+    path = manifest_path(project_root, destination, state_dir)
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text())
+    except Exception as exc:
+        print(f"[!] Could not read publish manifest, republishing everything: {exc}")
+        return {}
+    return data.get("files", {}) if isinstance(data, dict) else {}
+
+
+def save_manifest(project_root: Path, destination: str, files: dict, state_dir: Path = None):
+    path = manifest_path(project_root, destination, state_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"project": str(Path(project_root).resolve()), "destination": destination, "files": files}
+    path.write_text(json.dumps(data, indent=2, sort_keys=True))
+
+
+def scan_site(project_root: Path, previous=None) -> dict:
+    """Return {relative path: {"sha256", "size", "mtime_ns"}} for every page and asset.
+
+    Files whose size and mtime match the previous manifest reuse its hash, so only
+    touched files are read.
+    """
+    previous = previous or {}
+    files = {}
+    for dirname in PUBLISH_DIRS:
+        base = project_root / dirname
+        if not base.is_dir():
+            continue
+        for path in base.rglob("*"):
+            if not path.is_file():
+                continue
+            rel = path.relative_to(project_root).as_posix()
+            st = path.stat()
+            old = previous.get(rel)
+            if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                digest = old["sha256"]
+            else:
+                digest = file_digest(path)
+            files[rel] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    return files
+
+
+def diff_manifests(old: dict, new: dict):
+    """Return (changed, removed) relative paths between two manifests."""
+    changed = sorted(rel for rel, meta in new.items() if old.get(rel, {}).get("sha256") != meta["sha256"])
+    removed = sorted(rel for rel in old if rel not in new)
+    return changed, removed
+
+
+class Uploader(ABC):
+    """Backend that receives exported files. Subclass and register in UPLOADERS."""
+
+    @property
+    @abstractmethod
+    def destination(self) -> str:
+        """Stable id of the upload target; each destination keeps its own manifest."""
+
+    @abstractmethod
+    def upload(self, rel_path: str, local_path: Path):
+        ...
+
+    @abstractmethod
+    def delete(self, rel_path: str):
+        ...
+
+
+class FileSystemUploader(Uploader):
+    """Stand-in backend that mirrors published files into a local directory."""
+
+    def __init__(self, dest):
+        self.dest = Path(dest)
+
+    @property
+    def destination(self):
+        return f"filesystem:{self.dest.resolve()}"
+
+    def upload(self, rel_path, local_path):
+        target = self.dest / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(local_path, target)
+
+    def delete(self, rel_path):
+        target = self.dest / rel_path
+        if target.exists():
+            target.unlink()
+        _prune_empty_parents(target, self.dest)
+
+
+UPLOADERS = {
+    "filesystem": FileSystemUploader,
+}
+
+
+def get_uploader(name: str = None, **kwargs) -> Uploader:
+    name = name or os.environ.get("MINIPAINT_UPLOADER", "filesystem")
+    if name not in UPLOADERS:
+        raise ValueError(f"Unknown uploader '{name}'. Available: {', '.join(sorted(UPLOADERS))}")
+    return UPLOADERS[name](**kwargs)
+
+
+def _prune_empty_parents(path: Path, root: Path):
+    """Remove path's parent directories up to (not including) root while they are empty."""
+    parent = path.parent
+    while parent != root and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def clear_previous_export(output_dir: Path):
+    """Remove only the files the last publish exported into output_dir, never anything else."""
+    index = output_dir / EXPORT_INDEX
+    if not index.exists():
+        return
+    try:
+        exported = json.loads(index.read_text())
+    except Exception as exc:
+        print(f"[!] Could not read {index}, leaving previous export in place: {exc}")
+        return
+    for rel in exported:
+        path = output_dir / rel
+        if path.is_file():
+            path.unlink()
+        # Prune directories the export created once they are empty.
+        _prune_empty_parents(path, output_dir)
+    index.unlink()
+
+
+def publish_site(project_root: Path, output_dir: Path, uploader: Uploader, state_dir: Path = None):
+    """Export and upload only the pages/assets whose content hash changed since the last publish."""
+    project_root = Path(project_root)
+    output_dir = Path(output_dir)
+    old = load_manifest(project_root, uploader.destination, state_dir)
+    new = scan_site(project_root, previous=old)
+    changed, removed = diff_manifests(old, new)
+
+    # output_dir holds exactly the delta of this publish
+    clear_previous_export(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / EXPORT_INDEX).write_text(json.dumps(changed, indent=2))
+
+    for rel in changed:
+        exported = output_dir / rel
+        exported.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(project_root / rel, exported)
+        uploader.upload(rel, exported)
+    for rel in removed:
+        uploader.delete(rel)
+
+    # Only record the new state once every upload went through.
+    save_manifest(project_root, uploader.destination, new, state_dir)
+    return {"changed": changed, "removed": removed, "unchanged": len(new) - len(changed)}
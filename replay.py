@@ -0,0 +1,371 @@
+"""Record MiniPaint input sessions and replay them as a rendering benchmark.
+
+Record by running the editor with MINIPAINT_RECORD=session.jsonl, then replay:
+
+    python replay.py session.jsonl            # headless, no display needed
+    python replay.py session.jsonl --tk       # through a real (hidden) MiniPaint window
+    python replay.py --synthetic --repeat 3   # generated strokes, shapes and page switches
+
+Session files are JSON lines. The first line is a header
+{"format": "minipaint-input", "version": 1, "canvas": [w, h]} and every following line is
+an event with "t" (seconds since recording started) and "type":
+  press / motion / release  pointer events with "x", "y"
+  state                     tool settings: "mode", "color", "brush_size", "text_size", "fill"
+  switch                    page switch with "file"
+  clear                     canvas cleared
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+
+from memory_stats import percentile
+
+FORMAT = "minipaint-input"
+VERSION = 1
+
+POINTER_HANDLERS = {"press": "start_draw", "motion": "draw_motion", "release": "stop_draw"}
+STATE_HANDLERS = ("set_mode", "set_color", "change_brush_size", "change_text_size", "toggle_fill")
+
+
+class InputRecorder:
+    """Appends MiniPaint pointer/tool events to a JSON-lines session file as they happen."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fh = None
+        self._t0 = None
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("MINIPAINT_RECORD")
+        return cls(path) if path else None
+
+    def _write(self, record):
+        self._fh.write(json.dumps(record) + "\n")
+        self._fh.flush()
+
+    def emit(self, type_, **fields):
+        self._write(dict(t=round(time.perf_counter() - self._t0, 6), type=type_, **fields))
+
+    def emit_state(self, app):
+        self.emit("state", mode=app.mode, color=app.current_color, brush_size=app.brush_size,
+                  text_size=app.text_size, fill=app.fill_shapes)
+
+    def attach(self, app):
+        """Wrap the app's handlers so every input is logged before it runs."""
+        self._fh = open(self.path, "w")
+        self._t0 = time.perf_counter()
+        self._write({"format": FORMAT, "version": VERSION, "canvas": [app.canvas_width, app.canvas_height]})
+        self.emit_state(app)
+
+        def wrap(name, before=None, after=None):
+            original = getattr(app, name)
+
+            @functools.wraps(original)
+            def handler(*args, **kwargs):
+                if before:
+                    before(*args, **kwargs)
+                result = original(*args, **kwargs)
+                if after:
+                    after()
+                return result
+
+            setattr(app, name, handler)
+
+        for type_, name in POINTER_HANDLERS.items():
+            wrap(name, before=lambda event, type_=type_: self.emit(type_, x=event.x, y=event.y))
+        for name in STATE_HANDLERS:
+            wrap(name, after=lambda: self.emit_state(app))
+        wrap("switch_file", before=lambda filename: self.emit("switch", file=filename))
+        wrap("clear_canvas", before=lambda: self.emit("clear"))
+        return self
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+def load_session(path):
+    lines = Path(path).read_text().splitlines()
+    header = json.loads(lines[0]) if lines else {}
+    if header.get("format") != FORMAT:
+        raise ValueError(f"{path} is not a {FORMAT} recording")
+    if header.get("version", 0) > VERSION:
+        raise ValueError(f"{path} uses format version {header['version']}, newest supported is {VERSION}")
+    return header, [json.loads(line) for line in lines[1:] if line.strip()]
+
+
+def synthetic_session(strokes=40, points=30, shapes=10, pages=4, switches=12, seed=0, size=(1920, 1080)):
+    """A reproducible session mixing brush strokes, shape drags and page switches."""
+    rng = random.Random(seed)
+    w, h = size
+    events = []
+    t = 0.0
+
+    def add(type_, **fields):
+        nonlocal t
+        t += 0.008
+        events.append(dict(t=round(t, 6), type=type_, **fields))
+
+    def drag(n):
+        x, y = rng.randrange(w), rng.randrange(h)
+        add("press", x=x, y=y)
+        for _ in range(n):
+            x = min(w - 1, max(0, x + rng.randint(-25, 25)))
+            y = min(h - 1, max(0, y + rng.randint(-25, 25)))
+            add("motion", x=x, y=y)
+        add("release", x=x, y=y)
+
+    files = ["landing.png"] + [f"page_{i}.png" for i in range(1, pages)]
+    actions = ["stroke"] * strokes + ["shape"] * shapes + ["switch"] * switches
+    rng.shuffle(actions)
+    for action in actions:
+        if action == "stroke":
+            add("state", mode=rng.choice(["draw", "erase"]), color="#0f172a",
+                brush_size=rng.randint(2, 20), text_size=24, fill=False)
+            drag(points)
+        elif action == "shape":
+            add("state", mode=rng.choice(["line", "rectangle", "ellipse"]), color="#3b82f6",
+                brush_size=rng.randint(2, 8), text_size=24, fill=rng.random() < 0.5)
+            drag(points // 2)
+        else:
+            add("switch", file=rng.choice(files))
+    return {"format": FORMAT, "version": VERSION, "canvas": [w, h]}, events
+
+
+class _NullWidget:
+    """Accepts any widget call; stands in for toolbar/status widgets when headless."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _HeadlessCanvas(_NullWidget):
+    def __init__(self):
+        self._next_id = 1
+
+    def _create(self, *args, **kwargs):
+        self._next_id += 1
+        return self._next_id
+
+    create_line = create_rectangle = create_oval = create_image = _create
+
+
+class _HeadlessPhoto:
+    """Performs the full-frame pixel copy a Tk PhotoImage would, without Tk."""
+
+    def __init__(self, img):
+        self._size = img.size
+        self._pixels = img.tobytes()
+
+    def width(self):
+        return self._size[0]
+
+    def height(self):
+        return self._size[1]
+
+
+# MiniPaint methods that only touch image/canvas state and can run against the headless shim.
+_BORROWED = (
+    "status_text", "memory_text", "refresh_status", "set_mode", "switch_file", "get_or_create_image",
+    "_new_blank_image", "record_file_history", "enforce_memory_budget", "on_file_change",
+    "start_draw", "draw_motion", "stop_draw", "preview_shape", "clear_preview_shape", "commit_shape",
+    "get_text_font", "_display_photo", "update_canvas_image", "clear_canvas",
+)
+
+
+def make_headless_app():
+    """Build a MiniPaint stand-in that runs the real drawing handlers without a display."""
+    from PIL import ImageDraw
+
+    from generate_png import MiniPaint
+    from memory_stats import MemoryBudget
+
+    class HeadlessPaint:
+        def __init__(self):
+            self.canvas_width = 1920
+            self.canvas_height = 1080
+            self.current_color = "#000000"
+            self.brush_size = 5
+            self.fill_shapes = False
+            self.text_size = 24
+            self.mode = "draw"
+            self.shape_start = None
+            self.preview_shape_id = None
+            self.generated_code = {}
+            self.mode_labels = {mode: mode for mode in ("draw", "erase", "text", "line", "rectangle", "ellipse")}
+            self.files = ["landing.png"]
+            self.current_file = self.files[0]
+            self.file_images = {self.current_file: self._new_blank_image()}
+            self.file_history = {self.current_file: []}
+            self.history_limit = 10
+            self.dirty_files = set()
+            self.photo_cache = OrderedDict()
+            self.photo_cache_size = 4
+            self.memory_budget = MemoryBudget()
+            self.tool_selector = self.file_selector = _NullWidget()
+            self.status_label = self.memory_label = self.message_label = _NullWidget()
+            self.canvas = _HeadlessCanvas()
+            self.img = self.get_or_create_image(self.current_file)
+            self.draw = ImageDraw.Draw(self.img)
+            self.tk_img = self._make_photo(self.img)
+            self.canvas_img_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_img)
+            self.photo_cache[self.current_file] = self.tk_img
+            self.last_x = None
+            self.last_y = None
+
+        def _make_photo(self, img):
+            return _HeadlessPhoto(img)
+
+    for name in _BORROWED:
+        setattr(HeadlessPaint, name, MiniPaint.__dict__[name])
+    return HeadlessPaint()
+
+
+def make_tk_app():
+    from generate_png import MiniPaint
+
+    app = MiniPaint()
+    app.withdraw()
+    return app
+
+
+def _placeholder_text(app):
+    # Text input normally opens a dialog; replay draws a fixed string instead.
+    def add_text(x, y):
+        app.draw.text((x, y), "Replay", fill=app.current_color, font=app.get_text_font())
+        app.update_canvas_image()
+    return add_text
+
+
+def _summarize(values):
+    return {
+        "count": len(values),
+        "mean_ms": (sum(values) / len(values) * 1000) if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0,
+    }
+
+
+def replay(app, events, realtime=False, pump=None):
+    """Feed events through the app's handlers; returns per-event, frame and memory stats."""
+    from memory_stats import current_rss, memory_report, peak_rss
+
+    frame_times = []
+    original_update = app.update_canvas_image
+
+    def timed_update():
+        start = time.perf_counter()
+        original_update()
+        frame_times.append(time.perf_counter() - start)
+
+    app.update_canvas_image = timed_update
+    app.add_text = _placeholder_text(app)
+
+    handler_times = {}
+    rss_before = current_rss()
+    wall_start = time.perf_counter()
+    for event in events:
+        if realtime:
+            delay = event.get("t", 0) - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        type_ = event["type"]
+        start = time.perf_counter()
+        if type_ in POINTER_HANDLERS:
+            getattr(app, POINTER_HANDLERS[type_])(SimpleNamespace(x=event["x"], y=event["y"]))
+        elif type_ == "state":
+            if event["mode"] != app.mode:
+                app.set_mode(event["mode"])
+            app.current_color = event["color"]
+            app.brush_size = event["brush_size"]
+            app.text_size = event["text_size"]
+            app.fill_shapes = event["fill"]
+        elif type_ == "switch":
+            app.switch_file(event["file"])
+        elif type_ == "clear":
+            app.clear_canvas()
+        else:
+            continue
+        if pump:
+            pump()
+        handler_times.setdefault(type_, []).append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+
+    app.update_canvas_image = original_update
+    report = memory_report(app)
+    rss_after = current_rss()
+    return {
+        "events": sum(len(v) for v in handler_times.values()),
+        "wall_s": wall,
+        "handlers": {type_: _summarize(times) for type_, times in handler_times.items()},
+        "frames": _summarize(frame_times),
+        "memory": {
+            "held": report["total"],
+            "structures": report["structures"],
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "peak_rss": peak_rss(),
+        },
+    }
+
+
+def print_report(result):
+    from memory_stats import format_bytes
+
+    print(f"\n{result['events']} events in {result['wall_s']:.2f}s")
+    print(f"  {'handler':<10}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    rows = sorted(result["handlers"].items()) + [("frame", result["frames"])]
+    for name, s in rows:
+        print(f"  {name:<10}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+              f"{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    mem = result["memory"]
+    structures = ", ".join(f"{k} {format_bytes(v)}" for k, v in mem["structures"].items())
+    print(f"  memory: held {format_bytes(mem['held'])} ({structures})")
+    print(f"  rss: {format_bytes(mem['rss_before'])} -> {format_bytes(mem['rss_after'])}, "
+          f"peak {format_bytes(mem['peak_rss'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded MiniPaint input and time the handlers.")
+    parser.add_argument("session", nargs="?", help="recorded session (.jsonl)")
+    parser.add_argument("--synthetic", action="store_true", help="replay a generated session instead")
+    parser.add_argument("--tk", action="store_true", help="replay through a real hidden MiniPaint window")
+    parser.add_argument("--realtime", action="store_true", help="honour recorded event timing")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        _header, events = synthetic_session()
+    elif args.session:
+        _header, events = load_session(args.session)
+    else:
+        parser.error("pass a session file or --synthetic")
+
+    results = []
+    for _ in range(args.repeat):
+        if args.tk:
+            app = make_tk_app()
+            result = replay(app, events, realtime=args.realtime, pump=app.update)
+            app.destroy()
+        else:
+            result = replay(make_headless_app(), events, realtime=args.realtime)
+        print_report(result)
+        results.append(result)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
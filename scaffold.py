@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+TEMPLATE_REPO = "rajput-hemant/nextjs-template"
+EXTRA_PACKAGES = [
+    "@mantine/core",
+    "@mantine/hooks",
+    "@nextui-org/react",
+    "flowbite-react",
+    "daisyui",
+    "@headlessui/react",
+    "tw-animate-css",
+]
+# Add a few core components up front to avoid repeated prompts.
+BASIC_COMPONENTS = [
+    "button",
+    "input",
+    "card",
+    "textarea",
+    "dialog",
+    "dropdown-menu",
+    "navigation-menu",
+    "separator",
+    "label",
+    "checkbox",
+    "sheet",
+    "avatar"
+]
+
+CACHE_DIR = Path(os.environ.get("SKETCHTOUI_CACHE", Path.home() / ".cache" / "sketchtoui"))
+STAMP_NAME = ".scaffold.json"
+
+
+def ensure_package_manager_is_npm(project_root: Path):
+    """Force packageManager to npm so shadcn uses npm instead of bun."""
+    pkg_path = project_root / "package.json"
+    if not pkg_path.exists():
+        print(f"[!] package.json not found under {project_root}. Skipping shadcn setup.")
+        return
+    try:
+        data = json.loads(pkg_path.read_text())
+    except Exception as exc:
+        print(f"[!] Could not read package.json: {exc}")
+        return
+    if "packageManager" not in data:
+        npm_version = subprocess.run(["npm", "-v"], capture_output=True, text=True)
+        version_str = (npm_version.stdout or "").strip() or "latest"
+        data["packageManager"] = f"npm@{version_str}"
+        pkg_path.write_text(json.dumps(data, indent=2))
+        print(f"[✔] Set packageManager to npm@{version_str}")
+
+
+def shadcn_ui_dir(project_root: Path) -> Path:
+    """Directory shadcn writes components into, based on components.json aliases."""
+    ui_alias = "@/components/ui"
+    try:
+        config = json.loads((project_root / "components.json").read_text())
+        ui_alias = config.get("aliases", {}).get("ui") or ui_alias
+    except Exception:
+        pass
+    if ui_alias.startswith(("@/", "~/")):
+        ui_alias = ui_alias[2:]
+    return project_root / ui_alias
+
+
+def missing_shadcn_components(project_root: Path, components=BASIC_COMPONENTS):
+    ui_dir = shadcn_ui_dir(project_root)
+    return [name for name in components if not (ui_dir / f"{name}.tsx").exists()]
+
+
+def ensure_shadcn_setup(project_root: Path):
+    """Initialize shadcn/ui once using npm (creates components.json) and add missing components."""
+    components_config = project_root / "components.json"
+    ensure_package_manager_is_npm(project_root)
+    if not components_config.exists():
+        print("[*] Initializing shadcn/ui with npm...")
+        try:
+            subprocess.run(
+                # Some shadcn versions reject --package-manager; rely on packageManager in package.json instead.
+                ["npx", "--yes", "shadcn@latest", "init"],
+                cwd=project_root,
+                check=False,
+            )
+        except FileNotFoundError:
+            print("[!] npm or npx not found; cannot initialize shadcn/ui.")
+            return
+    missing = missing_shadcn_components(project_root)
+    if not missing:
+        print("[✔] shadcn/ui components already present")
+        return
+    try:
+        subprocess.run(
+            ["npx", "--yes", "shadcn@latest", "add", *missing],
+            cwd=project_root,
+            check=False,
+        )
+    except FileNotFoundError:
+        print("[!] npm or npx not found; cannot add shadcn/ui components.")
+
+
+def ensure_tsconfig_aliases(project_root: Path):
+    """Make sure tsconfig.json has @/* and ~/* pointing to project root."""
+    ts_path = project_root / "tsconfig.json"
+    if not ts_path.exists():
+        print(f"[!] tsconfig.json not found under {project_root}, skipping alias setup.")
+        return
+    raw = ts_path.read_text()
+    if '"@/*"' in raw:
+        return
+    # tsconfig may contain comments, so patch the text instead of round-tripping JSON
+    data = raw.replace('"~/*": ["./*"]', '"~/*": ["./*"],"@/*": ["./*"]')
+    ts_path.write_text(data)
+    print("[✔] Ensured tsconfig path aliases for @/* and ~/*")
+
+
+def _missing_packages(project_root: Path, packages=EXTRA_PACKAGES):
+    modules = project_root / "node_modules"
+    return [name for name in packages if not (modules / name / "package.json").exists()]
+
+
+def template_key(template=TEMPLATE_REPO, packages=EXTRA_PACKAGES, components=BASIC_COMPONENTS) -> str:
+    """Cache key for a prepared template; changes whenever the recipe changes."""
+    recipe = json.dumps({"template": template, "packages": packages, "components": components}, sort_keys=True)
+    return hashlib.sha256(recipe.encode()).hexdigest()[:16]
+
+
+def prepare_template(project_root: Path, template=TEMPLATE_REPO):
+    """Run every scaffolding step in project_root, skipping steps whose outputs already exist."""
+    project_root.mkdir(parents=True, exist_ok=True)
+    if not (project_root / "package.json").exists():
+        subprocess.run(["npx", "-y", "degit", template, "--force"], cwd=project_root)
+    if not (project_root / "node_modules").is_dir():
+        subprocess.run(["npm", "i"], cwd=project_root)
+    missing = _missing_packages(project_root)
+    if missing:
+        subprocess.run(["npm", "install", *missing], cwd=project_root)
+    ensure_tsconfig_aliases(project_root)
+    ensure_shadcn_setup(project_root)
+
+
+def template_is_complete(project_root: Path) -> bool:
+    return (
+        (project_root / "package.json").exists()
+        and (project_root / "node_modules").is_dir()
+        and (project_root / "components.json").exists()
+        and not _missing_packages(project_root)
+        and not missing_shadcn_components(project_root)
+    )
+
+
+def build_snapshot(cache_dir: Path = CACHE_DIR, rebuild: bool = False) -> Path:
+    """Prepare the template once under cache_dir and return the snapshot directory."""
+    key = template_key()
+    snapshot = cache_dir / key
+    stamp = snapshot / STAMP_NAME
+    if stamp.exists() and not rebuild:
+        return snapshot
+
+    # Build into a staging dir so an interrupted install never leaves a half-made snapshot behind.
+    staging = cache_dir / f"{key}.partial"
+    if rebuild and staging.exists():
+        # A forced rebuild must not resume a leftover half-built staging dir.
+        shutil.rmtree(staging)
+    print(f"[*] Building template snapshot {key} (one-time)...")
+    prepare_template(staging)
+    if not template_is_complete(staging):
+        raise RuntimeError(f"Template scaffolding incomplete in {staging}; rerun with network access.")
+
+    (staging / STAMP_NAME).write_text(json.dumps({"key": key, "template": TEMPLATE_REPO}, indent=2))
+    if snapshot.exists():
+        shutil.rmtree(snapshot)
+    staging.rename(snapshot)
+    print(f"[✔] Template snapshot cached at {snapshot}")
+    return snapshot
+
+
+def _link_or_copy(modules_dir: Path):
+    """copytree copy_function that hardlinks package files but copies npm's own bookkeeping."""
+    def copy(src, dst):
+        # Top-level dot entries (.package-lock.json, .cache, ...) are rewritten in place by
+        # npm and build tools, which would write straight through a hardlink into the cache.
+        if Path(src).relative_to(modules_dir).parts[0].startswith("."):
+            return shutil.copy2(src, dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        return dst
+    return copy
+
+
+def restore_snapshot(snapshot: Path, project_root: Path):
+    """Populate project_root from a snapshot.
+
+    Package files in node_modules are hardlinked and share inodes with the cache: npm
+    replaces them rather than editing them, but anything that rewrites one of them in
+    place (e.g. patch-package) also changes the cached template for every later --fresh.
+    Rebuild with --rebuild-template if that happens. npm's top-level bookkeeping files and
+    everything outside node_modules are copied, so generated pages never write into the cache.
+    """
+    project_root.mkdir(parents=True, exist_ok=True)
+    for entry in snapshot.iterdir():
+        if entry.name == STAMP_NAME:
+            continue
+        target = project_root / entry.name
+        if entry.is_dir() and not entry.is_symlink():
+            copy_function = _link_or_copy(entry) if entry.name == "node_modules" else shutil.copy2
+            shutil.copytree(entry, target, symlinks=True, copy_function=copy_function, dirs_exist_ok=True)
+        else:
+            shutil.copy2(entry, target, follow_symlinks=False)
+
+
+def clear_directory(folder: Path):
+    for path in folder.iterdir():
+        try:
+            if path.is_file() or path.is_symlink():
+                path.unlink()
+            elif path.is_dir():
+                shutil.rmtree(path)
+        except Exception as e:
+            print('Failed to delete %s. Reason: %s' % (path, e))
+
+
+def fresh_project(project_root: Path, cache_dir: Path = CACHE_DIR, rebuild: bool = False):
+    """Reset project_root to a prepared template, building the cached snapshot only if needed."""
+    snapshot = build_snapshot(cache_dir, rebuild=rebuild)
+    project_root.mkdir(parents=True, exist_ok=True)
+    clear_directory(project_root)
+    restore_snapshot(snapshot, project_root)
+    print(f"[✔] Fresh project ready at {project_root}")
@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layout_flow import attach_text_to_elements, merge_ocr_entries, suppress_duplicate_boxes
+
+
+def word(text, x1, y1, x2, y2):
+    return {"text": text, "bbox": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]}
+
+
+def box(label, confidence, bbox):
+    return {"label": label, "confidence": confidence, "bbox": bbox}
+
+
+def test_adjacent_elements_keep_their_own_words():
+    login = [0.09, 0.48, 0.16, 0.53]
+    signup = [0.165, 0.48, 0.23, 0.53]
+    entries = [word("Login", 0.10, 0.495, 0.15, 0.515), word("Signup", 0.17, 0.495, 0.22, 0.515)]
+
+    merged = merge_ocr_entries(entries, element_boxes=[login, signup])
+    layout = attach_text_to_elements({"elements": [{"bbox": login}, {"bbox": signup}]}, {"entries": merged})
+
+    assert [t["text"] for t in layout["elements"][0]["texts"]] == ["Login"]
+    assert [t["text"] for t in layout["elements"][1]["texts"]] == ["Signup"]
+
+
+def test_words_inside_one_element_merge_into_a_line():
+    card = [0.0, 0.0, 0.5, 0.5]
+    entries = [word("Hello", 0.10, 0.10, 0.15, 0.12), word("World", 0.16, 0.10, 0.21, 0.12)]
+
+    merged = merge_ocr_entries(entries, element_boxes=[card])
+
+    assert [m["text"] for m in merged] == ["Hello World"]
+    assert merged[0]["word_count"] == 2
+
+
+def test_nms_keeps_detection_order_so_text_stays_with_the_first_owner():
+    button = box("button", 0.6, [0.5, 0.5, 0.6, 0.6])
+    card = box("card", 0.7, [0.0, 0.0, 1.0, 1.0])
+
+    kept, removed = suppress_duplicate_boxes([button, card])
+    layout = attach_text_to_elements({"elements": kept}, {"entries": [word("Buy", 0.52, 0.53, 0.58, 0.57)]})
+
+    assert removed == 0
+    assert [el["label"] for el in kept] == ["button", "card"]
+    assert [t["text"] for t in layout["elements"][0]["texts"]] == ["Buy"]
+    assert layout["elements"][1]["texts"] == []
+
+
+def test_nms_drops_overlapping_duplicate_of_the_same_class():
+    elements = [box("button", 0.5, [0.10, 0.10, 0.30, 0.20]), box("button", 0.9, [0.11, 0.10, 0.31, 0.20])]
+
+    kept, removed = suppress_duplicate_boxes(elements, merge=False)
+
+    assert removed == 1
+    assert kept == [elements[1]]
+
+
+def test_nms_keeps_nested_element_of_the_same_class():
+    outer = box("card", 0.9, [0.0, 0.0, 0.8, 0.8])
+    inner = box("card", 0.8, [0.1, 0.1, 0.3, 0.3])
+
+    kept, removed = suppress_duplicate_boxes([outer, inner])
+
+    assert removed == 0
+    assert kept == [outer, inner]
+
+
+def test_nms_class_aware_only_suppresses_within_a_class():
+    elements = [box("button", 0.9, [0.10, 0.10, 0.30, 0.20]), box("input", 0.8, [0.10, 0.10, 0.30, 0.21])]
+
+    kept, removed = suppress_duplicate_boxes(elements, class_aware=True)
+    assert removed == 0 and [el["label"] for el in kept] == ["button", "input"]
+
+    kept, removed = suppress_duplicate_boxes(elements, class_aware=False, merge=True)
+    assert removed == 1 and [el["label"] for el in kept] == ["button"]
+    assert kept[0]["bbox"] == [0.10, 0.10, 0.30, 0.21]
@@ -0,0 +1,117 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from llm_client import HttpBackend, LLMBusy, LLMClient, LLMError, LLMTimeout, TransientLLMError
+from loadtest import CANNED_TSX, StubModelServer
+
+
+class ScriptedBackend:
+    """Callable backend that plays back one action per call: a delay in seconds or an exception."""
+
+    def __init__(self, *actions, accepts_timeout=False):
+        self.actions = list(actions)
+        self.accepts_timeout = accepts_timeout
+        self.calls = 0
+        self.daemon_threads = []
+        self._lock = threading.Lock()
+
+    def __call__(self, layout_json, timeout=None, **kwargs):
+        with self._lock:
+            action = self.actions[min(self.calls, len(self.actions) - 1)]
+            self.calls += 1
+            self.daemon_threads.append(threading.current_thread().daemon)
+        if isinstance(action, Exception):
+            raise action
+        time.sleep(action)
+        return f"code for {layout_json}", {}
+
+
+def test_transient_failure_is_retried():
+    backend = ScriptedBackend(TransientLLMError("HTTP 503"), 0)
+    client = LLMClient(backend, timeout=1.0, max_retries=2, backoff=0)
+
+    code, _ = client.generate_ui_code("{}")
+
+    assert code == "code for {}"
+    assert client.stats["attempts"] == 2 and client.stats["retries"] == 1
+
+
+def test_non_transient_failure_is_not_retried():
+    backend = ScriptedBackend(LLMError("HTTP 400"), 0)
+    client = LLMClient(backend, timeout=1.0, max_retries=2, backoff=0)
+
+    with pytest.raises(LLMError, match="HTTP 400"):
+        client.generate_ui_code("{}")
+    assert backend.calls == 1 and client.stats["failures"] == 1
+
+
+def test_deadline_abandons_a_backend_that_ignores_it_on_a_daemon_thread():
+    backend = ScriptedBackend(0.5)
+    client = LLMClient(backend, timeout=0.1, max_retries=2, backoff=0)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate_ui_code("{}")
+
+    assert time.monotonic() - started < 0.4
+    # The abandoned request still holds its slot, so nothing is retried on top of it.
+    assert backend.calls == 1 and client.stats["timeouts"] == 1
+    assert backend.daemon_threads == [True]
+
+
+def test_busy_slots_fail_at_once_without_retry_or_timeout():
+    release = threading.Event()
+
+    def blocking_backend(layout_json, **kwargs):
+        release.wait()
+        return "code", {}
+
+    client = LLMClient(blocking_backend, timeout=5.0, max_retries=2, backoff=0, max_concurrency=1)
+    holder = threading.Thread(target=client.generate_ui_code, args=("{}",))
+    holder.start()
+    while client.stats["attempts"] == 0:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    with pytest.raises(LLMBusy):
+        client.generate_ui_code("{}")
+    release.set()
+    holder.join()
+
+    assert time.monotonic() - started < 0.5
+    assert client.stats["busy"] == 1 and client.stats["timeouts"] == 0 and client.stats["retries"] == 0
+
+
+def test_hedge_answers_when_the_first_request_stalls():
+    backend = ScriptedBackend(1.0, 0, accepts_timeout=True)
+    client = LLMClient(backend, timeout=2.0, max_retries=0, hedge_after=0.05)
+
+    started = time.monotonic()
+    code, _ = client.generate_ui_code("{}")
+
+    assert code == "code for {}"
+    assert time.monotonic() - started < 0.5
+    assert client.stats["hedges"] == 1
+
+
+def test_http_backend_round_trip_and_retry_after_timeout():
+    with StubModelServer(latency=0, chunk_delay=0) as server:
+        client = LLMClient(HttpBackend(server.url), timeout=2.0)
+        code, context = client.generate_ui_code("{}", filename="page.png")
+        client.close()
+    assert code == CANNED_TSX
+    assert context == {"filename": "page.png"}
+
+    with StubModelServer(latency=0.5, jitter=0, chunk_delay=0) as server:
+        client = LLMClient(HttpBackend(server.url), timeout=0.1, max_retries=1, backoff=0)
+        with pytest.raises(LLMTimeout):
+            client.generate_ui_code("{}")
+        client.close()
+    # HttpBackend stops at its own deadline, so the timeout is retried.
+    assert client.stats["attempts"] == 2 and client.stats["timeouts"] == 2
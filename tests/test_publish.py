@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from publish import EXPORT_INDEX, FileSystemUploader, diff_manifests, publish_site
+from scaffold import clear_directory
+
+
+def entry(digest):
+    return {"sha256": digest, "size": 1, "mtime_ns": 0}
+
+
+def write_page(project, name, code):
+    page = project / "app" / name / "page.tsx"
+    page.parent.mkdir(parents=True, exist_ok=True)
+    page.write_text(code)
+
+
+def test_diff_manifests_reports_changed_and_removed():
+    old = {"app/a/page.tsx": entry("1"), "app/b/page.tsx": entry("2"), "app/c/page.tsx": entry("3")}
+    new = {"app/a/page.tsx": entry("1"), "app/b/page.tsx": entry("9"), "app/d/page.tsx": entry("4")}
+
+    changed, removed = diff_manifests(old, new)
+
+    assert changed == ["app/b/page.tsx", "app/d/page.tsx"]
+    assert removed == ["app/c/page.tsx"]
+
+
+def test_publish_uploads_only_changes_and_prunes_removed_pages(tmp_path):
+    project, export, dest, state = (tmp_path / d for d in ("site", "export", "dest", "state"))
+    uploader = FileSystemUploader(dest)
+    write_page(project, "a", "A")
+    write_page(project, "b", "B")
+
+    first = publish_site(project, export, uploader, state_dir=state)
+    assert first["changed"] == ["app/a/page.tsx", "app/b/page.tsx"]
+
+    write_page(project, "a", "A2")
+    (project / "app" / "b" / "page.tsx").unlink()
+    second = publish_site(project, export, uploader, state_dir=state)
+
+    assert second == {"changed": ["app/a/page.tsx"], "removed": ["app/b/page.tsx"], "unchanged": 0}
+    assert (dest / "app" / "a" / "page.tsx").read_text() == "A2"
+    assert not (dest / "app" / "b").exists()
+    # The export dir holds only this publish's delta.
+    assert sorted(p.relative_to(export).as_posix() for p in export.rglob("*") if p.is_file()) == [
+        EXPORT_INDEX, "app/a/page.tsx",
+    ]
+
+
+def test_manifest_survives_a_fresh_project_reset(tmp_path):
+    project, export, dest, state = (tmp_path / d for d in ("site", "export", "dest", "state"))
+    uploader = FileSystemUploader(dest)
+    write_page(project, "old", "old")
+    publish_site(project, export, uploader, state_dir=state)
+
+    clear_directory(project)
+    write_page(project, "new", "new")
+    result = publish_site(project, export, uploader, state_dir=state)
+
+    assert result["removed"] == ["app/old/page.tsx"]
+    assert not (dest / "app" / "old").exists()
+    assert (dest / "app" / "new" / "page.tsx").exists()
+
+
+def test_publish_leaves_unrelated_export_files_alone(tmp_path):
+    project, export, state = tmp_path / "site", tmp_path / "export", tmp_path / "state"
+    export.mkdir()
+    (export / "keep.txt").write_text("mine")
+    write_page(project, "a", "A")
+
+    publish_site(project, export, FileSystemUploader(tmp_path / "dest"), state_dir=state)
+    publish_site(project, export, FileSystemUploader(tmp_path / "dest"), state_dir=state)
+
+    assert (export / "keep.txt").read_text() == "mine"